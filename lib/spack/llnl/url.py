@@ -3,7 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 """URL primitives that just require Python standard library."""
-import itertools
+import functools
 import os.path
 import re
 from typing import Optional, Set, Tuple
@@ -14,15 +14,37 @@
 EXTENSIONS = ("gz", "bz2", "xz", "Z")
 NO_TAR_EXTENSIONS = ("zip", "tgz", "tbz2", "tbz", "txz", "whl")
 
-# Add PREFIX_EXTENSIONS and EXTENSIONS last so that .tar.gz is matched *before* .tar or .gz
+# Every PREFIX_EXTENSIONS.EXTENSIONS combination, followed by PREFIX_EXTENSIONS, EXTENSIONS
+# and NO_TAR_EXTENSIONS, so that .tar.gz is matched *before* .tar or .gz
 ALLOWED_ARCHIVE_TYPES = (
-    tuple(".".join(ext) for ext in itertools.product(PREFIX_EXTENSIONS, EXTENSIONS))
-    + PREFIX_EXTENSIONS
-    + EXTENSIONS
-    + NO_TAR_EXTENSIONS
+    "tar.gz",
+    "tar.bz2",
+    "tar.xz",
+    "tar.Z",
+    "TAR.gz",
+    "TAR.bz2",
+    "TAR.xz",
+    "TAR.Z",
+    "tar",
+    "TAR",
+    "gz",
+    "bz2",
+    "xz",
+    "Z",
+    "zip",
+    "tgz",
+    "tbz2",
+    "tbz",
+    "txz",
+    "whl",
 )
 CONTRACTION_MAP = {"tgz": "tar.gz", "txz": "tar.xz", "tbz": "tar.bz2", "tbz2": "tar.bz2"}
 
+# Patterns matching each allowed archive extension at the end of a path, in the same order
+_ALLOWED_ARCHIVE_TYPE_RES = tuple((ext, re.compile(rf"\.{ext}$")) for ext in ALLOWED_ARCHIVE_TYPES)
+# Only this many trailing characters (the longest extension plus its dot) can affect a match
+_ARCHIVE_TYPE_SUFFIX_LENGTH = max(len(ext) for ext in ALLOWED_ARCHIVE_TYPES) + 1
+
 
 def find_list_urls(url: str) -> Set[str]:
     r"""Find good list URLs for the supplied URL.
@@ -155,6 +177,20 @@ def has_extension(path_or_url: str, ext: str) -> bool:
     return False
 
 
+@functools.lru_cache(maxsize=4096)
+def _allowed_extension_of_suffix(suffix: str) -> Optional[str]:
+    for ext, regex in _ALLOWED_ARCHIVE_TYPE_RES:
+        if regex.search(suffix):
+            return ext
+    return None
+
+
+def _first_allowed_extension(path_or_url: str) -> Optional[str]:
+    """Returns the first allowed archive extension present in the input, or None."""
+    prefix, _ = split_url_on_sourceforge_suffix(path_or_url)
+    return _allowed_extension_of_suffix(prefix[-_ARCHIVE_TYPE_SUFFIX_LENGTH:])
+
+
 def extension_from_path(path_or_url: Optional[str]) -> Optional[str]:
     """Tries to match an allowed archive extension to the input. Returns the first match,
     or None if no match was found.
@@ -165,10 +201,7 @@ def extension_from_path(path_or_url: Optional[str]) -> Optional[str]:
     if path_or_url is None:
         raise ValueError("Can't call extension() on None")
 
-    for t in ALLOWED_ARCHIVE_TYPES:
-        if has_extension(path_or_url, t):
-            return t
-    return None
+    return _first_allowed_extension(path_or_url)
 
 
 def remove_extension(path_or_url: str, *, extension: str) -> str:
@@ -194,11 +227,8 @@ def strip_extension(path_or_url: str, *, extension: Optional[str] = None) -> str
     If extension is None, attempts to strip any allowed extension from path.
     """
     if extension is None:
-        for t in ALLOWED_ARCHIVE_TYPES:
-            if has_extension(path_or_url, ext=t):
-                extension = t
-                break
-        else:
+        extension = _first_allowed_extension(path_or_url)
+        if extension is None:
             return path_or_url
 
     return check_and_remove_ext(path_or_url, extension=extension)
@@ -431,9 +461,7 @@ def strip_compression_extension(path_or_url: str, ext: Optional[str] = None) ->
 
 def allowed_archive(path_or_url: str) -> bool:
     """Returns true if the input is a valid archive, False otherwise."""
-    return (
-        False if not path_or_url else any(path_or_url.endswith(t) for t in ALLOWED_ARCHIVE_TYPES)
-    )
+    return bool(path_or_url) and path_or_url.endswith(ALLOWED_ARCHIVE_TYPES)
 
 
 def determine_url_file_extension(path: str) -> str:
@@ -2,9 +2,9 @@
 # Spack Project Developers. See the top-level COPYRIGHT file for details.
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import contextlib
 import errno
 import getpass
-import glob
 import hashlib
 import io
 import os
@@ -12,7 +12,7 @@
 import stat
 import sys
 import tempfile
-from typing import Callable, Dict, Generator, Iterable, List, Optional, Set
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple
 
 import llnl.string
 import llnl.util.lang
@@ -43,7 +43,7 @@
 import spack.util.pattern as pattern
 import spack.util.url as url_util
 from spack import fetch_strategy as fs  # breaks a cycle
-from spack.util.crypto import bit_length, prefix_bits
+from spack.util.crypto import bit_length
 from spack.util.editor import editor, executable
 from spack.version import StandardVersion, VersionList
 
@@ -53,6 +53,9 @@
 # The temporary stage name prefix.
 stage_prefix = "spack-stage-"
 
+# Number of bits of the stage name hash used as the offset into the stage lock file.
+_lock_id_bits = bit_length(sys.maxsize)
+
 
 def compute_stage_name(spec):
     """Determine stage name given a spec"""
@@ -61,6 +64,12 @@ def compute_stage_name(spec):
     return spec.format_path(format_string=stage_name_structure)
 
 
+@llnl.util.lang.memoized
+def _current_user() -> str:
+    """Name of the user running Spack, looked up once per process."""
+    return getpass.getuser()
+
+
 def create_stage_root(path: str) -> None:
     """Create the stage root directory and ensure appropriate access perms."""
     assert os.path.isabs(path) and len(path.strip()) > 1
@@ -70,32 +79,43 @@ def create_stage_root(path: str) -> None:
     user_uid = getuid()
 
     # Obtain lists of ancestor and descendant paths of the $user node, if any.
-    group_paths, user_node, user_paths = partition_path(path, getpass.getuser())
+    group_paths, user_node, user_paths = partition_path(path, _current_user())
 
+    # Paths are ordered top-down, so the stat of each path doubles as the
+    # parent stat of the next one and every node is stat'ed only once.
+    par_stat = None
     for p in group_paths:
-        if not os.path.exists(p):
-            # Ensure access controls of subdirs created above `$user` inherit
-            # from the parent and share the group.
+        try:
+            par_stat = os.stat(p)
+            continue
+        except FileNotFoundError:
+            pass
+
+        # Ensure access controls of subdirs created above `$user` inherit
+        # from the parent and share the group.
+        if par_stat is None:
             par_stat = os.stat(os.path.dirname(p))
-            mkdirp(p, group=par_stat.st_gid, mode=par_stat.st_mode)
+        mkdirp(p, group=par_stat.st_gid, mode=par_stat.st_mode)
 
-            p_stat = os.stat(p)
-            if par_stat.st_gid != p_stat.st_gid:
-                tty.warn(
-                    "Expected {0} to have group {1}, but it is {2}".format(
-                        p, par_stat.st_gid, p_stat.st_gid
-                    )
+        p_stat = os.stat(p)
+        if par_stat.st_gid != p_stat.st_gid:
+            tty.warn(
+                "Expected {0} to have group {1}, but it is {2}".format(
+                    p, par_stat.st_gid, p_stat.st_gid
                 )
+            )
 
-            if par_stat.st_mode & p_stat.st_mode != par_stat.st_mode:
-                tty.warn(
-                    "Expected {0} to support mode {1}, but it is {2}".format(
-                        p, par_stat.st_mode, p_stat.st_mode
-                    )
+        if par_stat.st_mode & p_stat.st_mode != par_stat.st_mode:
+            tty.warn(
+                "Expected {0} to support mode {1}, but it is {2}".format(
+                    p, par_stat.st_mode, p_stat.st_mode
                 )
+            )
+
+        if not can_access(p):
+            raise OSError(errno.EACCES, err_msg.format(path, p))
 
-            if not can_access(p):
-                raise OSError(errno.EACCES, err_msg.format(path, p))
+        par_stat = p_stat
 
     # Add the path ending with the $user node to the user paths to ensure paths
     # from $user (on down) meet the ownership and permission requirements.
@@ -150,7 +170,7 @@ def _resolve_paths(candidates):
     $user and appending $user if it is not present in the path.
     """
     temp_path = sup.canonicalize_path("$tempdir")
-    user = getpass.getuser()
+    user = _current_user()
     tmp_has_usr = user in temp_path.split(os.path.sep)
 
     paths = []
@@ -195,6 +215,12 @@ def get_stage_root():
     return _stage_root
 
 
+@llnl.util.lang.memoized
+def _stage_lock_path(stage_root: str) -> str:
+    """Path of the single lock file shared by all stages under ``stage_root``."""
+    return os.path.join(stage_root, ".lock")
+
+
 def _mirror_roots():
     mirrors = spack.config.get("mirrors")
     return [
@@ -214,6 +240,10 @@ class LockableStagingDir:
     the same name, only one can enter the context manager at a time.
     """
 
+    #: Locks shared by all stages in this process, keyed by lock file and byte offset, so that
+    #: stages with the same name use the same lock object
+    stage_locks: Dict[Tuple[str, int], spack.util.lock.Lock] = {}
+
     def __init__(self, name, path, keep, lock):
         # TODO: This uses a protected member of tempfile, but seemed the only
         # TODO: way to get a temporary name.  It won't be the same as the
@@ -243,12 +273,17 @@ def __init__(self, name, path, keep, lock):
 
     def _get_lock(self):
         if not self._lock:
+            # Equivalent to prefix_bits(sha1, _lock_id_bits), without the per-byte Python loop
             sha1 = hashlib.sha1(self.name.encode("utf-8")).digest()
-            lock_id = prefix_bits(sha1, bit_length(sys.maxsize))
-            stage_lock_path = os.path.join(get_stage_root(), ".lock")
-            self._lock = spack.util.lock.Lock(
-                stage_lock_path, start=lock_id, length=1, desc=self.name
-            )
+            lock_id = int.from_bytes(sha1[:8], "big") >> (64 - _lock_id_bits)
+            stage_lock_path = _stage_lock_path(get_stage_root())
+
+            key = (stage_lock_path, lock_id)
+            if key not in LockableStagingDir.stage_locks:
+                LockableStagingDir.stage_locks[key] = spack.util.lock.Lock(
+                    stage_lock_path, start=lock_id, length=1, desc=self.name
+                )
+            self._lock = LockableStagingDir.stage_locks[key]
         return self._lock
 
     def __enter__(self):
@@ -289,11 +324,14 @@ def create(self):
         Ensures the top-level (config:build_stage) directory exists.
         """
         # User has full permissions and group has only read permissions
-        if not os.path.exists(self.path):
-            mkdirp(self.path, mode=stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP)
-        elif not os.path.isdir(self.path):
-            os.remove(self.path)
+        try:
+            is_dir = stat.S_ISDIR(os.stat(self.path).st_mode)
+        except FileNotFoundError:
             mkdirp(self.path, mode=stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP)
+        else:
+            if not is_dir:
+                os.remove(self.path)
+                mkdirp(self.path, mode=stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP)
 
         # Make sure we can actually do something with the stage we made.
         ensure_access(self.path)
@@ -410,15 +448,27 @@ def __init__(
             self.skip_checksum_for_mirror = True
 
         self.srcdir = None
+        self._source_path = os.path.join(self.path, _source_path_subdir)
 
         self.mirror_layout = mirror_paths
         self.mirrors = list(mirrors) if mirrors else []
         # Allow users the disable both mirrors and download cache
         self.default_fetcher_only = False
 
+        # Candidate archive paths depend only on the default fetcher, mirror layout and stage
+        # path, which are fixed at construction, so they are computed once on first use.
+        self._expected_archive_files: Optional[List[str]] = None
+        # Last archive path found on disk, re-validated on each access
+        self._archive_file: Optional[str] = None
+
     @property
     def expected_archive_files(self):
         """Possible archive file paths."""
+        if self._expected_archive_files is None:
+            self._expected_archive_files = self._compute_expected_archive_files()
+        return self._expected_archive_files
+
+    def _compute_expected_archive_files(self) -> List[str]:
         fnames = []
         expanded = True
         if isinstance(self.default_fetcher, fs.URLFetchStrategy):
@@ -448,11 +498,13 @@ def save_filename(self):
     @property
     def archive_file(self):
         """Path to the source archive within this stage directory."""
-        for path in self.expected_archive_files:
-            if os.path.exists(path):
-                return path
-        else:
-            return None
+        if self._archive_file is not None and os.path.exists(self._archive_file):
+            return self._archive_file
+
+        self._archive_file = next(
+            (path for path in self.expected_archive_files if os.path.exists(path)), None
+        )
+        return self._archive_file
 
     @property
     def expanded(self):
@@ -462,13 +514,9 @@ def expanded(self):
     @property
     def source_path(self):
         """Returns the well-known source directory path."""
-        return os.path.join(self.path, _source_path_subdir)
+        return self._source_path
 
     def _generate_fetchers(self, mirror_only=False) -> Generator["fs.FetchStrategy", None, None]:
-        fetchers: List[fs.FetchStrategy] = []
-        if not mirror_only:
-            fetchers.append(self.default_fetcher)
-
         # If this archive is normally fetched from a URL, then use the same digest.
         if isinstance(self.default_fetcher, fs.URLFetchStrategy):
             digest = self.default_fetcher.digest
@@ -479,32 +527,34 @@ def _generate_fetchers(self, mirror_only=False) -> Generator["fs.FetchStrategy",
             expand = True
             extension = None
 
+        # Fetchers are yielded in priority order (download cache, mirrors in the order they are
+        # provided, default fetcher) and created lazily, so none is built once a prior one succeeds
+        use_mirrors = not self.default_fetcher_only and self.mirror_layout
+
+        if use_mirrors and self.default_fetcher.cachable:
+            yield spack.caches.FETCH_CACHE.fetcher(
+                self.mirror_layout.path, digest, expand=expand, extension=extension
+            )
+
         # TODO: move mirror logic out of here and clean it up!
         # TODO: Or @alalazo may have some ideas about how to use a
         # TODO: CompositeFetchStrategy here.
-        if not self.default_fetcher_only and self.mirror_layout and self.mirrors:
+        if use_mirrors and self.mirrors:
             # Add URL strategies for all the mirrors with the digest
-            # Insert fetchers in the order that the URLs are provided.
-            fetchers[:0] = (
-                fs.from_url_scheme(
-                    url_util.join(mirror.fetch_url, self.mirror_layout.path),
+            for mirror in self.mirrors:
+                # Mirror.fetch_url re-resolves the configured URL on every access
+                fetch_url = mirror.fetch_url
+                if fetch_url.startswith("oci://"):  # no support for mirrors yet
+                    continue
+                yield fs.from_url_scheme(
+                    url_util.join(fetch_url, self.mirror_layout.path),
                     checksum=digest,
                     expand=expand,
                     extension=extension,
                 )
-                for mirror in self.mirrors
-                if not mirror.fetch_url.startswith("oci://")  # no support for mirrors yet
-            )
 
-        if not self.default_fetcher_only and self.mirror_layout and self.default_fetcher.cachable:
-            fetchers.insert(
-                0,
-                spack.caches.FETCH_CACHE.fetcher(
-                    self.mirror_layout.path, digest, expand=expand, extension=extension
-                ),
-            )
-
-        yield from fetchers
+        if not mirror_only:
+            yield self.default_fetcher
 
         # The search function may be expensive, so wait until now to call it so the user can stop
         # if a prior fetcher succeeded
@@ -525,7 +575,7 @@ def fetch(self, mirror_only: bool = False, err_msg: Optional[str] = None) -> Non
                 fetcher.stage = self
                 self.fetcher = fetcher
                 self.fetcher.fetch()
-                break
+                return
             except fs.NoCacheError:
                 # Don't bother reporting when something is not cached.
                 continue
@@ -535,16 +585,17 @@ def fetch(self, mirror_only: bool = False, err_msg: Optional[str] = None) -> Non
             except spack.error.SpackError as e:
                 errors.append(f"{fetcher}: {e.__class__.__name__}: {e}")
                 continue
-        else:
-            self.fetcher = self.default_fetcher
-            if err_msg:
-                raise spack.error.FetchError(err_msg)
-            raise spack.error.FetchError(
-                f"All fetchers failed for {self.name}", "\n".join(f"    {e}" for e in errors)
-            )
+
+        # All fetchers failed
+        self.fetcher = self.default_fetcher
+        if err_msg:
+            raise spack.error.FetchError(err_msg)
+        raise spack.error.FetchError(
+            f"All fetchers failed for {self.name}", "\n".join(f"    {e}" for e in errors)
+        )
 
     def steal_source(self, dest):
-        """Copy the source_path directory in its entirety to directory dest
+        """Move or copy the source_path directory in its entirety to directory dest
 
         This operation creates/fetches/expands the stage if it is not already,
         and destroys the stage when it is done."""
@@ -558,22 +609,35 @@ def steal_source(self, dest):
         if not os.path.isdir(dest):
             mkdirp(dest)
 
-        # glob all files and directories in the source path
-        hidden_entries = glob.glob(os.path.join(self.source_path, ".*"))
-        entries = glob.glob(os.path.join(self.source_path, "*"))
+        # The stage is destroyed afterwards, so when the destination is on the same filesystem
+        # entries are renamed into place instead of copied. Symlinks are always copied, so
+        # that relative links are not moved away from the tree they point into.
+        dest_dev = os.stat(dest).st_dev
+        same_fs = os.stat(self.source_path).st_dev == dest_dev
 
         # Move all files from stage to destination directory
         # Include hidden files for VCS repo history
-        for entry in hidden_entries + entries:
-            if os.path.isdir(entry):
-                d = os.path.join(dest, os.path.basename(entry))
-                shutil.copytree(entry, d, symlinks=True)
+        with os.scandir(self.source_path) as it:
+            entries = list(it)
+
+        for entry in entries:
+            target = os.path.join(dest, entry.name)
+            if same_fs and not entry.is_symlink():
+                os.replace(entry.path, target)
+            elif entry.is_dir():
+                shutil.copytree(entry.path, target, symlinks=True)
             else:
-                shutil.copy2(entry, dest)
+                shutil.copy2(entry.path, target)
 
         # copy archive file if we downloaded from url -- replaces for vcs
-        if self.archive_file and os.path.exists(self.archive_file):
-            shutil.copy2(self.archive_file, dest)
+        archive_file = self.archive_file
+        if archive_file:
+            target = os.path.join(dest, os.path.basename(archive_file))
+            # A cached download is a symlink into the download cache: copy its contents
+            if not os.path.islink(archive_file) and os.stat(archive_file).st_dev == dest_dev:
+                os.replace(archive_file, target)
+            else:
+                shutil.copy2(archive_file, target)
 
         # remove leftover stage
         self.destroy()
@@ -703,15 +767,7 @@ def _add_to_root_stage(self):
             placement = {"": placement}
 
         target_path = os.path.join(root_stage.source_path, resource.destination)
-
-        try:
-            os.makedirs(target_path)
-        except OSError as err:
-            tty.debug(err)
-            if err.errno == errno.EEXIST and os.path.isdir(target_path):
-                pass
-            else:
-                raise
+        os.makedirs(target_path, exist_ok=True)
 
         for key, value in placement.items():
             destination_path = os.path.join(target_path, value)
@@ -758,6 +814,8 @@ def __init__(self):
                 "disable_mirrors",
             ]
         )
+        # One exit stack per (possibly nested) __enter__ call
+        self._exit_stacks: List[contextlib.ExitStack] = []
 
     @classmethod
     def from_iterable(cls, iterable: Iterable[Stage]) -> "StageComposite":
@@ -767,13 +825,17 @@ def from_iterable(cls, iterable: Iterable[Stage]) -> "StageComposite":
         return composite
 
     def __enter__(self):
-        for item in self:
-            item.__enter__()
+        # If entering a stage fails, the stages entered before it are exited again
+        with contextlib.ExitStack() as stack:
+            for item in self:
+                stack.enter_context(item)
+            self._exit_stacks.append(stack.pop_all())
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        for item in reversed(self):
-            item.__exit__(exc_type, exc_val, exc_tb)
+        # Stages are exited in reverse order, and all of them are exited even if one fails
+        if self._exit_stacks:
+            self._exit_stacks.pop().__exit__(exc_type, exc_val, exc_tb)
 
     #
     # Below functions act only on the *first* stage in the composite.
@@ -879,14 +941,18 @@ def ensure_access(file):
 def purge():
     """Remove all build directories in the top-level stage path."""
     root = get_stage_root()
-    if os.path.isdir(root):
-        for stage_dir in os.listdir(root):
-            if stage_dir.startswith(stage_prefix) or stage_dir == ".lock":
-                stage_path = os.path.join(root, stage_dir)
-                if os.path.isdir(stage_path):
-                    remove_linked_tree(stage_path)
-                else:
-                    os.remove(stage_path)
+    if not os.path.isdir(root):
+        return
+
+    with os.scandir(root) as it:
+        entries = [e for e in it if e.name.startswith(stage_prefix) or e.name == ".lock"]
+
+    for entry in entries:
+        # Follow symlinks, so that linked stages are removed along with their target
+        if entry.is_dir():
+            remove_linked_tree(entry.path)
+        else:
+            os.remove(entry.path)
 
 
 def interactive_version_filter(
@@ -559,6 +559,40 @@ def _install(src, dest):
     shutil.rmtree(log_dir)
 
 
+def test_log_install_rejects_stage_sibling(install_mockery, monkeypatch):
+    """Test that archive_files in a sibling of the stage whose name starts with the
+    stage path are rejected."""
+    spec = Spec("trivial-install-test-package").concretized()
+
+    log_path = spec.package.log_path
+    log_dir = os.path.dirname(log_path)
+    fs.mkdirp(log_dir)
+    with fs.working_dir(log_dir):
+        fs.touch(log_path)
+        fs.touch(spec.package.env_path)
+        fs.touch(spec.package.env_mods_path)
+        fs.touch(spec.package.configure_args_path)
+
+    install_path = os.path.dirname(spec.package.install_log_path)
+    fs.mkdirp(install_path)
+
+    stage_path = os.path.realpath(spec.package.stage.path)
+    sibling_file = os.path.join(stage_path + "abc", "config.log")
+    fs.touchp(sibling_file)
+    monkeypatch.setattr(type(spec.package), "archive_files", [sibling_file], raising=False)
+
+    try:
+        spack.installer.log(spec.package)
+
+        archive_dir = os.path.join(install_path, "archived-files")
+        with open(os.path.join(archive_dir, "errors.txt"), "r") as fd:
+            assert f"[OUTSIDE SOURCE PATH]: {sibling_file}" in fd.read()
+        assert not os.path.exists(os.path.join(archive_dir, "config.log"))
+    finally:
+        shutil.rmtree(os.path.dirname(sibling_file))
+        shutil.rmtree(log_dir)
+
+
 def test_unconcretized_install(install_mockery, mock_fetch, mock_packages):
     """Test attempts to perform install phases with unconcretized spec."""
     spec = Spec("trivial-install-test-package")
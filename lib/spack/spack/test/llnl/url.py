@@ -168,3 +168,15 @@ def test_strip_compression_extension(archive_and_expected):
 def test_allowed_archive(archive_and_expected):
     archive, _ = archive_and_expected
     assert llnl.url.allowed_archive(archive)
+
+
+def test_allowed_archive_types_match_extension_groups():
+    """Tests that the literal list of archive types is every combination of a tar prefix
+    and a compression extension, followed by the plain extensions.
+    """
+    compound = tuple(
+        ".".join(ext) for ext in itertools.product(llnl.url.PREFIX_EXTENSIONS, llnl.url.EXTENSIONS)
+    )
+    assert llnl.url.ALLOWED_ARCHIVE_TYPES == (
+        compound + llnl.url.PREFIX_EXTENSIONS + llnl.url.EXTENSIONS + llnl.url.NO_TAR_EXTENSIONS
+    )
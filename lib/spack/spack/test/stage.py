@@ -592,6 +592,65 @@ def test_restage(self, mock_stage_archive):
             assert "foobar" not in os.listdir(stage.source_path)
         check_destroy(stage, self.stage_name)
 
+    def test_steal_source(self, mock_stage_archive, tmpdir):
+        """Ensure the expanded source and the archive end up in the destination."""
+        archive = mock_stage_archive([_include_extra, _include_readme])
+        dest = str(tmpdir.join("dest"))
+
+        stage = Stage(archive.url, name=self.stage_name)
+        stage.steal_source(dest)
+
+        assert os.path.isfile(os.path.join(dest, _archive_base, _readme_fn))
+        assert os.path.isfile(os.path.join(dest, _extra_fn))
+        assert os.path.isfile(os.path.join(dest, _archive_fn))
+        assert not os.path.exists(stage.path)
+
+    def test_steal_source_copies_symlinked_archive(self, mock_stage_archive, tmpdir):
+        """Ensure an archive linked from the download cache is copied, not moved as a link."""
+        archive = mock_stage_archive([_include_readme])
+        dest = str(tmpdir.join("dest"))
+        cached = str(tmpdir.join("cached", _archive_fn))
+
+        stage = Stage(archive.url, name=self.stage_name)
+        stage.create()
+        stage.fetch()
+        mkdirp(os.path.dirname(cached))
+        shutil.move(stage.archive_file, cached)
+        os.symlink(cached, os.path.join(stage.path, _archive_fn))
+
+        stage.steal_source(dest)
+
+        stolen_archive = os.path.join(dest, _archive_fn)
+        assert os.path.isfile(stolen_archive) and not os.path.islink(stolen_archive)
+        assert os.path.isfile(cached)
+
+    def test_steal_source_across_filesystems(self, mock_stage_archive, tmpdir, monkeypatch):
+        """Ensure entries and the archive are copied when the destination is on another
+        device."""
+        archive = mock_stage_archive([_include_extra, _include_readme])
+        dest = str(tmpdir.join("dest"))
+
+        real_stat = os.stat
+
+        def _stat(path, *args, **kwargs):
+            result = real_stat(path, *args, **kwargs)
+            if str(path) != dest:
+                return result
+            fields = list(result)
+            fields[stat.ST_DEV] += 1
+            return os.stat_result(fields)
+
+        monkeypatch.setattr(os, "stat", _stat)
+        monkeypatch.setattr(os, "replace", lambda *args: pytest.fail("unexpected rename"))
+
+        stage = Stage(archive.url, name=self.stage_name)
+        stage.steal_source(dest)
+
+        assert os.path.isfile(os.path.join(dest, _archive_base, _readme_fn))
+        assert os.path.isfile(os.path.join(dest, _extra_fn))
+        assert os.path.isfile(os.path.join(dest, _archive_fn))
+        assert not os.path.exists(stage.path)
+
     def test_no_keep_without_exceptions(self, mock_stage_archive):
         archive = mock_stage_archive()
         stage = Stage(archive.url, name=self.stage_name, keep=False)
@@ -910,3 +969,65 @@ def test_override_keep_in_composite_stage():
     assert not stage_1.keep
     assert not stage_2.keep
     assert not stage_3.keep
+
+
+def test_stages_with_same_name_share_lock(tmp_build_stage_dir):
+    stage_1 = Stage("file:///does-not-exist", name="shared")
+    stage_2 = Stage("file:///does-not-exist", name="shared")
+    stage_3 = Stage("file:///does-not-exist", name="other")
+
+    assert stage_1._get_lock() is stage_2._get_lock()
+    assert stage_1._get_lock() is not stage_3._get_lock()
+
+
+class _RecordingStage:
+    """Stage stand-in that records when it is entered and exited."""
+
+    def __init__(self, name, events, fail=False):
+        self.name = name
+        self.events = events
+        self.fail = fail
+
+    def __enter__(self):
+        if self.fail:
+            raise RuntimeError(f"cannot enter {self.name}")
+        self.events.append(("enter", self.name))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.events.append(("exit", self.name))
+
+
+def test_composite_stage_exits_entered_stages_on_failure():
+    """Ensure stages already entered are exited if entering a later one fails."""
+    events = []
+    stages = StageComposite.from_iterable(
+        [
+            _RecordingStage("a", events),
+            _RecordingStage("b", events),
+            _RecordingStage("c", events, fail=True),
+        ]
+    )
+    with pytest.raises(RuntimeError, match="cannot enter c"):
+        with stages:
+            pass
+
+    assert events == [("enter", "a"), ("enter", "b"), ("exit", "b"), ("exit", "a")]
+
+
+def test_composite_stage_nested_enter():
+    """Ensure nested uses of the same composite exit every stage they entered."""
+    events = []
+    stages = StageComposite.from_iterable(
+        [_RecordingStage("a", events), _RecordingStage("b", events)]
+    )
+    with stages:
+        with stages:
+            pass
+        assert events == [("enter", "a"), ("enter", "b")] * 2 + [("exit", "b"), ("exit", "a")]
+
+    assert events == [("enter", "a"), ("enter", "b")] * 2 + [("exit", "b"), ("exit", "a")] * 2
+
+    # An unmatched exit is a no-op
+    stages.__exit__(None, None, None)
+    assert len(events) == 8
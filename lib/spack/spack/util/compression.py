@@ -90,13 +90,10 @@ def _py_bunzip(archive_file: str) -> str:
     """Returns path to decompressed file.
     Decompresses bz2 compressed archives/files via python's bz2 module"""
     decompressed_file = os.path.basename(llnl.url.strip_compression_extension(archive_file, "bz2"))
-    working_dir = os.getcwd()
-    archive_out = os.path.join(working_dir, decompressed_file)
-    f_bz = bz2.BZ2File(archive_file, mode="rb")
-    with open(archive_out, "wb") as ar:
-        shutil.copyfileobj(f_bz, ar)
-    f_bz.close()
-    return archive_out
+    with open(decompressed_file, "wb") as ar:
+        with bz2.open(archive_file, mode="rb") as f_bz:
+            shutil.copyfileobj(f_bz, ar)
+    return decompressed_file
 
 
 def _system_bunzip(archive_file: str) -> str:
@@ -129,13 +126,10 @@ def _py_gunzip(archive_file: str) -> str:
     """Returns path to gunzip'd file. Decompresses `.gz` compressed archvies via python gzip
     module"""
     decompressed_file = os.path.basename(llnl.url.strip_compression_extension(archive_file, "gz"))
-    working_dir = os.getcwd()
-    destination_abspath = os.path.join(working_dir, decompressed_file)
-    f_in = gzip.open(archive_file, "rb")
-    with open(destination_abspath, "wb") as f_out:
-        shutil.copyfileobj(f_in, f_out)
-    f_in.close()
-    return destination_abspath
+    with open(decompressed_file, "wb") as f_out:
+        with gzip.open(archive_file, "rb") as f_in:
+            shutil.copyfileobj(f_in, f_out)
+    return decompressed_file
 
 
 def _system_gunzip(archive_file: str) -> str:
@@ -221,11 +215,10 @@ def _py_lzma(archive_file: str) -> str:
     """Returns path to decompressed .xz files. Decompress lzma compressed .xz files via Python
     lzma module."""
     decompressed_file = os.path.basename(llnl.url.strip_compression_extension(archive_file, "xz"))
-    archive_out = os.path.join(os.getcwd(), decompressed_file)
-    with open(archive_out, "wb") as ar:
+    with open(decompressed_file, "wb") as ar:
         with lzma.open(archive_file) as lar:
             shutil.copyfileobj(lar, ar)
-    return archive_out
+    return decompressed_file
 
 
 def _xz(archive_file):
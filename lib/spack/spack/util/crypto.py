@@ -93,8 +93,18 @@ def checksum_stream(hashlib_algo: HashFactory, fp: BinaryIO, *, block_size: int
 
 def checksum(hashlib_algo: HashFactory, filename: str, *, block_size: int = 2**20) -> str:
     """Returns a hex digest of the filename generated using an algorithm from hashlib."""
-    with open(filename, "rb") as f:
-        return checksum_stream(hashlib_algo, f, block_size=block_size)
+    hasher = hashlib_algo()
+    # Read into a single reusable buffer (like hashlib.file_digest, which needs Python 3.11)
+    # instead of allocating a new bytes object per block.
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(filename, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            hasher.update(view[:size])
+    return hasher.hexdigest()
 
 
 class Checker: